@@ -1,23 +1,131 @@
+import asyncio
+import logging
+import os
+import sys
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
 from app.config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 client = None
 db = None
+client_pid = None
 
 
 async def connect_to_mongo():
-    global client, db
-    client = AsyncIOMotorClient(settings.mongodb_url)
+    global client, db, client_pid
+    if client is not None and client_pid == os.getpid():
+        return
+    # A client inherited from a parent process (e.g. a pre-fork server) shares
+    # its sockets and background threads, so each worker opens its own.
+    # timeoutMS bounds every operation (server selection, pool wait and the
+    # query itself, which the driver sends as maxTimeMS)
+    client = AsyncIOMotorClient(settings.mongodb_url, timeoutMS=settings.db_timeout_ms)
     db = client.get_default_database()
-    print("Connected to MongoDB")
+    client_pid = os.getpid()
+    logger.info("Connected to MongoDB", extra={"pid": client_pid})
+
+
+# Delta sync walks products and tombstones in (updated_at, _id) order.
+# Review listing: newest first, optionally by featured flag or product;
+# rating comes last so rating ranges filter inside the index walk without
+# needing an in-memory sort (equality, sort, range).
+NEWEST_FIRST = [("created_at", DESCENDING), ("_id", DESCENDING)]
+INDEXES = [
+    ("products", [("updated_at", ASCENDING), ("_id", ASCENDING)], {}),
+    ("product_tombstones", [("updated_at", ASCENDING), ("_id", ASCENDING)], {}),
+    (
+        "product_tombstones",
+        "deleted_at",
+        {"expireAfterSeconds": settings.tombstone_retention_days * 86400},
+    ),
+    ("reviews", NEWEST_FIRST + [("rating", ASCENDING)], {}),
+    (
+        "reviews",
+        [("is_featured", ASCENDING)] + NEWEST_FIRST + [("rating", ASCENDING)],
+        {},
+    ),
+    (
+        "reviews",
+        [("product_name", ASCENDING)] + NEWEST_FIRST + [("rating", ASCENDING)],
+        {},
+    ),
+    # One document per settings type; also stops two concurrent first saves
+    # of the site settings from both inserting one
+    ("settings", "type", {"unique": True}),
+    # The job dispatcher claims the oldest due job by status
+    ("jobs", [("status", ASCENDING), ("run_at", ASCENDING)], {}),
+    (
+        "jobs",
+        "finished_at",
+        {"expireAfterSeconds": settings.job_retention_days * 86400},
+    ),
+]
+
+
+async def ensure_indexes() -> bool:
+    """Create the indexes the queries rely on (no-op if they already exist)
+
+    Each index is attempted on its own, so one failure (e.g. duplicate
+    settings documents blocking the unique index) doesn't skip the rest.
+    Returns False if any of them failed.
+    """
+    # Index builds can take much longer than the per-operation deadline the
+    # API client enforces, so they get a client without timeoutMS
+    index_client = AsyncIOMotorClient(settings.mongodb_url)
+    index_db = index_client.get_default_database()
+    ok = True
+    try:
+        for collection, keys, options in INDEXES:
+            try:
+                await index_db[collection].create_index(keys, **options)
+            except PyMongoError:
+                ok = False
+                logger.warning(
+                    "Could not create index",
+                    exc_info=True,
+                    extra={"collection": collection, "keys": str(keys)},
+                )
+    finally:
+        index_client.close()
+    return ok
+
+
+async def ensure_indexes_in_background():
+    """Create indexes without holding up (or failing) startup"""
+    try:
+        await ensure_indexes()
+    except PyMongoError:
+        # Queries still work without them, just slower; retried next start
+        logger.warning("Could not create indexes", exc_info=True)
 
 
 async def close_mongo_connection():
-    global client
+    global client, db, client_pid
     if client:
         client.close()
-        print("MongoDB connection closed")
+        client = None
+        db = None
+        client_pid = None
+        logger.info("MongoDB connection closed")
 
 
 def get_database():
     return db
+
+
+async def _main():
+    from app.config.logging_config import setup_logging
+
+    setup_logging()
+    if await ensure_indexes():
+        logger.info("Indexes are up to date")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    # One-off: python -m app.config.database
+    sys.exit(asyncio.run(_main()))
@@ -25,6 +25,65 @@ class Settings(BaseSettings):
     cloudinary_api_key: str = ""
     cloudinary_api_secret: str = ""
 
+    # Server Settings (production launcher, see app/server.py)
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 0  # 0 = one worker per CPU core
+    graceful_shutdown_timeout: int = 30  # seconds to drain in-flight requests
+    keep_alive_timeout: int = 5
+
+    # Live Updates (GET /api/events)
+    change_streams_enabled: bool = True  # False = always poll updated_at
+    events_poll_interval: float = 2.0  # seconds, polling fallback only
+    events_poll_overlap: float = 10.0  # seconds re-checked for late writes
+    events_queue_size: int = 100  # buffered events per connected client
+    events_heartbeat_interval: float = 15.0
+
+    # Indexes (or run `python -m app.config.database` once per deploy)
+    create_indexes_on_startup: bool = True  # in the background, never blocks
+
+    # Delta Sync (GET /api/products/changes)
+    tombstone_retention_days: int = 30  # older sync tokens must resync fully
+    sync_safety_window_seconds: float = 10.0  # recent changes are sent again
+
+    # Database Resilience
+    db_timeout_ms: int = 2000  # per-operation deadline (also sent as maxTimeMS)
+    db_breaker_failure_threshold: int = 5  # consecutive failures to open the circuit
+    db_breaker_reset_seconds: float = 30.0  # wait before retrying the database
+    stale_cache_max_entries: int = 1000  # last good public responses kept
+
+    # Catalog Snapshots (see app/services/snapshots.py)
+    snapshots_enabled: bool = False  # rebuild snapshots after admin writes
+    serve_snapshots: bool = False  # answer public GETs from snapshot files
+    snapshot_dir: str = "snapshots"  # must be shared storage with several hosts
+    snapshot_keep_versions: int = 3
+    snapshot_rebuild_delay: float = 1.0  # seconds to batch writes into one rebuild
+
+    # Background Jobs (see app/services/jobs.py)
+    job_concurrency: int = 4  # jobs run at once per worker process
+    job_max_attempts: int = 5
+    job_retry_base_delay: float = 2.0  # seconds, doubled on every retry
+    job_retry_max_delay: float = 300.0
+    job_poll_interval: float = 1.0  # seconds between checks for due jobs
+    job_lease_seconds: int = 60  # a job running longer is retried elsewhere
+    job_timeout_seconds: float = 45.0  # handler deadline, below the lease
+    job_retention_days: int = 7  # finished jobs are deleted after this
+
+    # Logging (see app/config/logging_config.py)
+    log_level: str = "INFO"
+    log_queue_size: int = 10000  # records buffered for the writer thread
+    access_log_sample_rate: float = 0.1  # share of ordinary requests logged
+    access_log_slow_ms: float = 500.0  # slower requests are always logged
+
+    @field_validator("job_timeout_seconds")
+    @classmethod
+    def timeout_below_lease(cls, value, info):
+        """A job still running when its lease ends would run twice"""
+        lease = info.data.get("job_lease_seconds")
+        if lease is not None and value >= lease:
+            raise ValueError("job_timeout_seconds must be below job_lease_seconds")
+        return value
+
     @property
     def allowed_origins_list(self) -> List[str]:
         """Parse comma-separated origins into a list"""
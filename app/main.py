@@ -1,17 +1,41 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+import asyncio
 from contextlib import asynccontextmanager
 from app.config.settings import settings
-from app.config.database import connect_to_mongo, close_mongo_connection
+from app.config.logging_config import setup_logging
+from app.config.database import (
+    connect_to_mongo,
+    close_mongo_connection,
+    ensure_indexes_in_background,
+)
 from app.routes import products, settings as settings_routes, auth, upload, reviews
+from app.routes import events, jobs
+from app.services.events import event_broker
+from app.services.jobs import job_queue
+from app.services.resilience import DatabaseUnavailable
+from app.services.snapshots import SnapshotMiddleware, snapshot_refresher
+from app.services.access_log import RequestLogMiddleware
+
+setup_logging()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    indexes = None
+    if settings.create_indexes_on_startup:
+        indexes = asyncio.create_task(ensure_indexes_in_background())
+    job_queue.start()
     yield
     # Shutdown
+    if indexes:
+        indexes.cancel()
+    await snapshot_refresher.close()
+    await job_queue.close()
+    await event_broker.close()
     await close_mongo_connection()
 
 
@@ -22,6 +46,10 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Serve public reads from pre-rendered files (added first so CORS wraps it)
+if settings.serve_snapshots:
+    app.add_middleware(SnapshotMiddleware)
+
 # CORS Middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,14 +57,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser frontends read concurrency and paging headers
+    expose_headers=[
+        "ETag",
+        "X-Next-Cursor",
+        "X-Total-Count",
+        "X-Total-Count-Capped",
+        "X-Request-ID",
+    ],
 )
 
+# Outermost, so the request id and timing cover everything below
+app.add_middleware(RequestLogMiddleware)
+
+
+@app.exception_handler(DatabaseUnavailable)
+async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+    """Fail fast with 503 while the database is down instead of hanging"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database temporarily unavailable, please retry shortly"},
+        headers={"Retry-After": str(int(settings.db_breaker_reset_seconds))},
+    )
+
+
 # Include routers
 app.include_router(products.router, prefix="/api")
 app.include_router(settings_routes.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
 app.include_router(upload.router, prefix="/api")
 app.include_router(reviews.router, prefix="/api")
+app.include_router(events.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
 
 
 @app.get("/")
@@ -54,6 +106,6 @@ async def health_check():
 
 
 if __name__ == "__main__":
-    import uvicorn
+    from app.server import main
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    main()
@@ -0,0 +1,24 @@
+from pydantic import BeforeValidator, PlainSerializer
+from typing import Annotated
+from bson import ObjectId
+
+
+def _validate_object_id(value) -> str:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return value
+    raise ValueError("Invalid ObjectId")
+
+
+def _serialize_object_id(value) -> str:
+    # Also covers raw ObjectIds left in models built with model_construct()
+    return str(value)
+
+
+# MongoDB ObjectId, exposed as a 24-character hex string in the API
+PyObjectId = Annotated[
+    str,
+    BeforeValidator(_validate_object_id),
+    PlainSerializer(_serialize_object_id, return_type=str, when_used="always"),
+]
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import Optional
+from datetime import datetime
+from app.models.common import PyObjectId
+
+
+class JobResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PyObjectId = Field(alias="_id")
+    type: str
+    payload: dict = {}
+    status: str
+    attempts: int = 0
+    max_attempts: int
+    run_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    result: Optional[dict] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobAccepted(BaseModel):
+    message: str
+    job_id: str
+
+
+JobAdapter = TypeAdapter(JobResponse)
@@ -1,24 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
-from bson import ObjectId
-
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v, values=None):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid ObjectId")
-        return ObjectId(v)
-
-    @classmethod
-    def __get_pydantic_json_schema__(cls, field_schema, handler):
-        field_schema.update(type="string")
-        return field_schema
+from app.models.common import PyObjectId
 
 
 class ProductBase(BaseModel):
@@ -50,20 +33,51 @@ class ProductUpdate(BaseModel):
 
 
 class ProductInDB(ProductBase):
-    id: str = Field(alias="_id")
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PyObjectId = Field(alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
-
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    version: int = 1
 
 
 class ProductResponse(ProductBase):
-    id: str = Field(alias="_id")
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True)
+
+    id: PyObjectId = Field(alias="_id")
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    version: int = 0
+
+
+class ProductTombstone(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    id: PyObjectId = Field(alias="_id")
+    deleted_at: datetime
+
+
+class ProductChanges(BaseModel):
+    upserted: List[ProductResponse]
+    deleted: List[ProductTombstone]
+    next: Optional[str] = None
+    has_more: bool = False
+
+
+class ProductLookup(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=100)
+
+
+class ProductLookupResult(BaseModel):
+    id: str
+    found: bool
+    product: Optional[ProductResponse] = None
+
 
-    class Config:
-        populate_by_name = True
-        from_attributes = True
+# Built once at import: creating a TypeAdapter compiles a validator/serializer.
+# Validating DB documents with them runs in pydantic-core and is faster than
+# model_construct(), which loops over fields in Python (benchmarks/models.py).
+ProductAdapter = TypeAdapter(ProductResponse)
+ProductListAdapter = TypeAdapter(List[ProductResponse])
+ProductChangesAdapter = TypeAdapter(ProductChanges)
+ProductLookupAdapter = TypeAdapter(List[ProductLookupResult])
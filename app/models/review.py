@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+from typing import Optional, List
 from datetime import datetime
+from app.models.common import PyObjectId
 
 
 class ReviewBase(BaseModel):
@@ -17,14 +18,30 @@ class ReviewCreate(ReviewBase):
 
 
 class ReviewUpdate(BaseModel):
-    customer_name: Optional[str] = None
+    customer_name: Optional[str] = Field(None, min_length=1, max_length=100)
     customer_image: Optional[str] = None
     rating: Optional[int] = Field(None, ge=1, le=5)
-    review_text: Optional[str] = None
+    review_text: Optional[str] = Field(None, min_length=1, max_length=500)
     product_name: Optional[str] = None
     is_featured: Optional[bool] = None
 
 
-class ReviewResponse(ReviewBase):
-    id: str
-    created_at: datetime
+class ReviewResponse(BaseModel):
+    # No length/range limits: a stored review that predates a limit must
+    # still be listed (and fixable), not fail the whole response
+    model_config = ConfigDict(populate_by_name=True, from_attributes=True)
+
+    id: PyObjectId = Field(alias="_id")
+    customer_name: str
+    customer_image: Optional[str] = None
+    rating: int
+    review_text: str
+    product_name: Optional[str] = None
+    is_featured: bool = False
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# Cached adapters, see app/models/product.py
+ReviewAdapter = TypeAdapter(ReviewResponse)
+ReviewListAdapter = TypeAdapter(List[ReviewResponse])
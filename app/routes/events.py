@@ -0,0 +1,47 @@
+import asyncio
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from app.config.settings import settings
+from app.services.events import event_broker, format_sse
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+@router.get("")
+async def stream_events(request: Request):
+    """Stream catalog changes as server-sent events
+
+    Each `change` event carries the collection, the operation (`upsert`,
+    `delete` or `resync`), the document id and the new document. `resync`
+    means the client fell behind and should refetch what it displays.
+
+    Without change streams (standalone MongoDB, or change_streams_enabled
+    off) changes are polled and delivery is best-effort: review and settings
+    deletions are never reported, and a write that takes longer than
+    `events_poll_overlap` seconds to commit can be missed. Clients should
+    still refetch now and then (e.g. when the tab regains focus).
+    """
+
+    async def event_stream():
+        queue = event_broker.subscribe()
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=settings.events_heartbeat_interval
+                    )
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            event_broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException, Depends
+from bson import ObjectId
+from app.auth.basic_auth import verify_credentials
+from app.models.job import JobResponse, JobAdapter
+from app.utils.responses import model_response
+from app.services.jobs import job_queue
+from app.services.resilience import db_call
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, username: str = Depends(verify_credentials)):
+    """Get the status of a background job (Admin only)"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+
+    job = await db_call(lambda: job_queue.get(ObjectId(job_id)))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return model_response(JobAdapter, JobAdapter.validate_python(job))
@@ -1,40 +1,193 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Query
+from typing import List, Optional
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
 from app.config.database import get_database
-from app.models.product import ProductCreate, ProductUpdate, ProductResponse
+from app.config.settings import settings
+from app.models.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductResponse,
+    ProductChanges,
+    ProductAdapter,
+    ProductListAdapter,
+    ProductChangesAdapter,
+    ProductLookup,
+    ProductLookupResult,
+    ProductLookupAdapter,
+)
 from app.auth.basic_auth import verify_credentials
+from app.utils.concurrency import (
+    parse_if_match,
+    version_filter,
+    etag,
+    precondition_failed,
+)
+from app.utils.sync_token import encode_sync_token, decode_sync_token
+from app.utils.responses import model_response
+from app.services.resilience import db_call, cached_read, stale_headers
+from app.services.snapshots import snapshot_refresher, PRODUCT_LISTS
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
 
-def serialize_product(product) -> dict:
-    """Convert MongoDB document to response format"""
-    if product:
-        product["_id"] = str(product["_id"])
-    return product
-
-
-@router.get("", response_model=List[dict])
+@router.get("", response_model=List[ProductResponse])
 async def get_all_products():
     """Get all products"""
     db = get_database()
-    products = await db.products.find().sort("created_at", -1).to_list(100)
-    return [serialize_product(p) for p in products]
+    products, stale = await cached_read(
+        "products:all",
+        lambda: db.products.find().sort("created_at", -1).to_list(100),
+    )
+    return model_response(
+        ProductListAdapter,
+        ProductListAdapter.validate_python(products),
+        headers=stale_headers(stale),
+    )
 
 
-@router.get("/featured", response_model=List[dict])
+@router.get("/featured", response_model=List[ProductResponse])
 async def get_featured_products():
     """Get featured products"""
     db = get_database()
-    products = (
-        await db.products.find({"is_featured": True}).sort("created_at", -1).to_list(10)
+    products, stale = await cached_read(
+        "products:featured",
+        lambda: db.products.find({"is_featured": True})
+        .sort("created_at", -1)
+        .to_list(10),
+    )
+    return model_response(
+        ProductListAdapter,
+        ProductListAdapter.validate_python(products),
+        headers=stale_headers(stale),
     )
-    return [serialize_product(p) for p in products]
 
 
-@router.get("/{product_id}")
+@router.get("/changes", response_model=ProductChanges)
+async def get_product_changes(
+    since: Optional[str] = None, limit: int = Query(500, ge=1, le=1000)
+):
+    """Get products changed since a sync token
+
+    Returns products created or updated and the ids of products deleted
+    after `since`, plus a `next` token to pass on the following call. Omit
+    `since` for a full sync. Keep calling while `has_more` is true.
+    """
+    db = get_database()
+    # Taken before reading: anything the client gets back is deleted later
+    issued_at = datetime.utcnow()
+
+    # A full sync of an empty catalog still needs a starting point
+    updated_at, last_id = datetime(1970, 1, 1), ObjectId("0" * 24)
+    if since:
+        position = decode_sync_token(since)
+        if position is None:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+        updated_at, last_id, token_issued_at = position
+        # Tombstones are pruned after the retention window, so a client that
+        # has not synced for that long may have missed deletions. A quiet
+        # catalog is fine: every call re-issues the token.
+        retention = timedelta(days=settings.tombstone_retention_days)
+        if token_issued_at < issued_at - retention:
+            raise HTTPException(
+                status_code=410, detail="Sync token expired, do a full sync"
+            )
+        query = {
+            "$or": [
+                {"updated_at": {"$gt": updated_at}},
+                {"updated_at": updated_at, "_id": {"$gt": last_id}},
+            ]
+        }
+    else:
+        query = {}
+
+    order = [("updated_at", 1), ("_id", 1)]
+    upserted = await db_call(
+        lambda: db.products.find(query).sort(order).to_list(limit + 1)
+    )
+    deleted = await db_call(
+        lambda: db.product_tombstones.find(query).sort(order).to_list(limit + 1)
+    )
+
+    # Merge both streams in (updated_at, _id) order and keep the first page
+    changes = sorted(
+        upserted + deleted, key=lambda doc: (doc["updated_at"], doc["_id"])
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    page_ids = {doc["_id"] for doc in changes}
+
+    # `updated_at` is stamped by the API host before the write commits, so a
+    # slow write or a host with a lagging clock can land behind changes that
+    # are already visible. Never move the position into the last few seconds:
+    # recent changes are sent again on the next call instead of being skipped.
+    position = (updated_at, last_id)
+    if changes:
+        position = (changes[-1]["updated_at"], changes[-1]["_id"])
+    horizon = (
+        issued_at - timedelta(seconds=settings.sync_safety_window_seconds),
+        ObjectId("0" * 24),
+    )
+    if position > horizon:
+        position = max(horizon, (updated_at, last_id))
+        # The rest of this page comes back next time; asking right away
+        # would only repeat it
+        has_more = False
+    next_token = encode_sync_token(*position, issued_at)
+
+    return model_response(
+        ProductChangesAdapter,
+        ProductChangesAdapter.validate_python(
+            {
+                "upserted": [p for p in upserted if p["_id"] in page_ids],
+                "deleted": [t for t in deleted if t["_id"] in page_ids],
+                "next": next_token,
+                "has_more": has_more,
+            }
+        ),
+    )
+
+
+@router.post("/lookup", response_model=List[ProductLookupResult])
+async def lookup_products(lookup: ProductLookup):
+    """Get several products by ID in one request
+
+    Results come back in request order. IDs that don't exist are returned
+    with `found: false` instead of failing the whole request.
+    """
+    db = get_database()
+
+    invalid = [
+        product_id for product_id in lookup.ids if not ObjectId.is_valid(product_id)
+    ]
+    if invalid:
+        raise HTTPException(
+            status_code=400, detail=f"Invalid product IDs: {', '.join(invalid)}"
+        )
+
+    object_ids = sorted({ObjectId(product_id) for product_id in lookup.ids})
+    products, stale = await cached_read(
+        "products:lookup:" + ",".join(str(oid) for oid in object_ids),
+        lambda: db.products.find({"_id": {"$in": object_ids}}).to_list(None),
+    )
+
+    by_id = {product["_id"]: product for product in products}
+    results = []
+    for product_id in lookup.ids:
+        product = by_id.get(ObjectId(product_id))
+        results.append(
+            {"id": product_id, "found": product is not None, "product": product}
+        )
+
+    return model_response(
+        ProductLookupAdapter,
+        ProductLookupAdapter.validate_python(results),
+        headers=stale_headers(stale),
+    )
+
+
+@router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(product_id: str):
     """Get a single product by ID"""
     db = get_database()
@@ -42,15 +195,23 @@ async def get_product(product_id: str):
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
-    product = await db.products.find_one({"_id": ObjectId(product_id)})
+    product, stale = await cached_read(
+        # Normalized id: differently cased spellings share one in-flight query
+        f"products:{ObjectId(product_id)}",
+        lambda: db.products.find_one({"_id": ObjectId(product_id)}),
+    )
 
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    return serialize_product(product)
+    return model_response(
+        ProductAdapter,
+        ProductAdapter.validate_python(product),
+        headers={"ETag": etag(product.get("version")), **stale_headers(stale)},
+    )
 
 
-@router.post("", status_code=status.HTTP_201_CREATED)
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=ProductResponse)
 async def create_product(
     product: ProductCreate, username: str = Depends(verify_credentials)
 ):
@@ -60,35 +221,67 @@ async def create_product(
     product_dict = product.model_dump()
     product_dict["created_at"] = datetime.utcnow()
     product_dict["updated_at"] = datetime.utcnow()
+    product_dict["version"] = 1
 
-    result = await db.products.insert_one(product_dict)
-    product_dict["_id"] = str(result.inserted_id)
+    result = await db_call(lambda: db.products.insert_one(product_dict))
+    product_dict["_id"] = result.inserted_id
+    snapshot_refresher.mark(PRODUCT_LISTS, result.inserted_id)
 
-    return product_dict
+    return model_response(
+        ProductAdapter,
+        ProductAdapter.validate_python(product_dict),
+        status_code=status.HTTP_201_CREATED,
+        headers={"ETag": etag(product_dict["version"])},
+    )
 
 
-@router.put("/{product_id}")
+@router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
-    product_id: str, product: ProductUpdate, username: str = Depends(verify_credentials)
+    product_id: str,
+    product: ProductUpdate,
+    if_match: Optional[str] = Header(None),
+    username: str = Depends(verify_credentials),
 ):
-    """Update a product (Admin only)"""
+    """Update a product (Admin only)
+
+    Send the product's ETag in `If-Match` to only apply the update if nobody
+    else changed the product in the meantime (412 otherwise).
+    """
     db = get_database()
 
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
+    expected_version = parse_if_match(if_match)
+
     update_data = {k: v for k, v in product.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
 
-    result = await db.products.update_one(
-        {"_id": ObjectId(product_id)}, {"$set": update_data}
+    query = {"_id": ObjectId(product_id)}
+    if expected_version is not None:
+        query.update(version_filter(expected_version))
+
+    updated_product = await db_call(
+        lambda: db.products.find_one_and_update(
+            query,
+            {"$set": update_data, "$inc": {"version": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
     )
 
-    if result.matched_count == 0:
+    if not updated_product:
+        if expected_version is not None and await db_call(
+            lambda: db.products.find_one({"_id": ObjectId(product_id)}, {"_id": 1})
+        ):
+            raise precondition_failed("Product")
         raise HTTPException(status_code=404, detail="Product not found")
 
-    updated_product = await db.products.find_one({"_id": ObjectId(product_id)})
-    return serialize_product(updated_product)
+    snapshot_refresher.mark(PRODUCT_LISTS, product_id)
+    return model_response(
+        ProductAdapter,
+        ProductAdapter.validate_python(updated_product),
+        headers={"ETag": etag(updated_product["version"])},
+    )
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -99,9 +292,32 @@ async def delete_product(product_id: str, username: str = Depends(verify_credent
     if not ObjectId.is_valid(product_id):
         raise HTTPException(status_code=400, detail="Invalid product ID")
 
-    result = await db.products.delete_one({"_id": ObjectId(product_id)})
+    object_id = ObjectId(product_id)
+    product = await db_call(
+        lambda: db.products.find_one({"_id": object_id}, {"updated_at": 1})
+    )
 
-    if result.deleted_count == 0:
+    if not product:
+        # A retried DELETE whose first attempt already removed the product
+        if await db_call(lambda: db.product_tombstones.find_one({"_id": object_id})):
+            return None
         raise HTTPException(status_code=404, detail="Product not found")
 
+    # Write the tombstone before deleting, so delta-sync clients always learn
+    # about the deletion even if the delete itself fails and is retried. It
+    # must sort after the product's last change.
+    now = datetime.utcnow()
+    last_change = product.get("updated_at")
+    if last_change and last_change >= now:
+        now = last_change + timedelta(milliseconds=1)
+    await db_call(
+        lambda: db.product_tombstones.replace_one(
+            {"_id": object_id},
+            {"_id": object_id, "deleted_at": now, "updated_at": now},
+            upsert=True,
+        )
+    )
+    await db_call(lambda: db.products.delete_one({"_id": object_id}))
+    snapshot_refresher.mark(PRODUCT_LISTS, product_id)
+
     return None
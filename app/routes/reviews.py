@@ -1,40 +1,147 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from typing import List, Optional
 from bson import ObjectId
 from datetime import datetime
 from app.config.database import get_database
-from app.models.review import ReviewCreate, ReviewUpdate, ReviewResponse
+from app.models.review import (
+    ReviewCreate,
+    ReviewUpdate,
+    ReviewResponse,
+    ReviewAdapter,
+    ReviewListAdapter,
+)
 from app.auth.basic_auth import verify_credentials
+from app.utils.responses import model_response
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.services.resilience import db_call, cached_read, stale_headers
+from app.services.snapshots import snapshot_refresher, REVIEWS
 
 router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
 
-def serialize_review(review) -> dict:
-    """Convert MongoDB document to response format"""
-    if review:
-        review["_id"] = str(review["_id"])
-    return review
+FEATURED_REVIEWS_LIMIT = 10
 
+# Filtered counts stop here so a broad filter can't scan the whole collection
+COUNT_LIMIT = 10_000
 
-@router.get("", response_model=List[dict])
-async def get_all_reviews():
-    """Get all reviews"""
+# Newest first; _id breaks ties between reviews created in the same instant
+NEWEST_FIRST = [("created_at", -1), ("_id", -1)]
+
+
+@router.get("", response_model=List[ReviewResponse])
+async def get_all_reviews(
+    min_rating: Optional[int] = Query(None, ge=1, le=5),
+    max_rating: Optional[int] = Query(None, ge=1, le=5),
+    product_name: Optional[str] = None,
+    product_id: Optional[str] = None,
+    is_featured: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+):
+    """Get reviews, newest first
+
+    Filter by rating range, product (name or id) and featured flag. When
+    there are more results the `X-Next-Cursor` header holds the cursor for
+    the next page. The first page also returns an `X-Total-Count` estimate
+    of the matching reviews; `X-Total-Count-Capped: true` means there are at
+    least that many.
+    """
     db = get_database()
-    reviews = await db.reviews.find().sort("created_at", -1).to_list(100)
-    return [serialize_review(r) for r in reviews]
+
+    filters = {}
+    if min_rating is not None or max_rating is not None:
+        filters["rating"] = {}
+        if min_rating is not None:
+            filters["rating"]["$gte"] = min_rating
+        if max_rating is not None:
+            filters["rating"]["$lte"] = max_rating
+    if product_id is not None:
+        # Reviews reference products by name
+        if not ObjectId.is_valid(product_id):
+            raise HTTPException(status_code=400, detail="Invalid product ID")
+        product = await db_call(
+            lambda: db.products.find_one({"_id": ObjectId(product_id)}, {"name": 1})
+        )
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        if product_name is not None and product_name != product["name"]:
+            return model_response(ReviewListAdapter, [], headers={"X-Total-Count": "0"})
+        product_name = product["name"]
+    if product_name is not None:
+        filters["product_name"] = product_name
+    if is_featured is not None:
+        filters["is_featured"] = is_featured
+
+    query = filters
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        created_at, last_id = position
+        after_cursor = {
+            "$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}},
+            ]
+        }
+        query = {"$and": [filters, after_cursor]} if filters else after_cursor
+
+    async def read_page():
+        # One extra row tells whether there is another page
+        page = db.reviews.find(query).sort(NEWEST_FIRST).limit(limit + 1)
+        reviews = await page.to_list(None)
+        total = None
+        if not cursor:
+            if filters:
+                # One past the limit tells whether the count was capped
+                total = await db.reviews.count_documents(filters, limit=COUNT_LIMIT + 1)
+            else:
+                # Collection metadata: constant time, may lag slightly
+                total = await db.reviews.estimated_document_count()
+        return reviews, total
+
+    key = (
+        f"reviews:list:{min_rating}:{max_rating}:{product_name}:{is_featured}"
+        f":{cursor}:{limit}"
+    )
+    (reviews, total), stale = await cached_read(key, read_page)
+
+    headers = stale_headers(stale)
+    if total is not None:
+        headers["X-Total-Count"] = str(min(total, COUNT_LIMIT))
+        if total > COUNT_LIMIT:
+            headers["X-Total-Count-Capped"] = "true"
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        last = reviews[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["_id"])
+
+    return model_response(
+        ReviewListAdapter,
+        ReviewListAdapter.validate_python(reviews),
+        headers=headers,
+    )
 
 
-@router.get("/featured", response_model=List[dict])
-async def get_featured_reviews():
+@router.get("/featured", response_model=List[ReviewResponse])
+async def get_featured_reviews(limit: int = Query(FEATURED_REVIEWS_LIMIT, ge=1, le=50)):
     """Get featured reviews for homepage"""
     db = get_database()
-    reviews = (
-        await db.reviews.find({"is_featured": True}).sort("created_at", -1).to_list(10)
+    reviews, stale = await cached_read(
+        f"reviews:featured:{limit}",
+        lambda: db.reviews.find({"is_featured": True})
+        .sort(NEWEST_FIRST)
+        .limit(limit)
+        .to_list(None),
+    )
+    return model_response(
+        ReviewListAdapter,
+        ReviewListAdapter.validate_python(reviews),
+        headers=stale_headers(stale),
     )
-    return [serialize_review(r) for r in reviews]
 
 
-@router.get("/{review_id}")
+@router.get("/{review_id}", response_model=ReviewResponse)
 async def get_review(review_id: str):
     """Get a single review by ID"""
     db = get_database()
@@ -42,15 +149,23 @@ async def get_review(review_id: str):
     if not ObjectId.is_valid(review_id):
         raise HTTPException(status_code=400, detail="Invalid review ID")
 
-    review = await db.reviews.find_one({"_id": ObjectId(review_id)})
+    review, stale = await cached_read(
+        # Normalized id: differently cased spellings share one in-flight query
+        f"reviews:{ObjectId(review_id)}",
+        lambda: db.reviews.find_one({"_id": ObjectId(review_id)}),
+    )
 
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
 
-    return serialize_review(review)
+    return model_response(
+        ReviewAdapter,
+        ReviewAdapter.validate_python(review),
+        headers=stale_headers(stale),
+    )
 
 
-@router.post("", status_code=status.HTTP_201_CREATED)
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=ReviewResponse)
 async def create_review(
     review: ReviewCreate, username: str = Depends(verify_credentials)
 ):
@@ -61,13 +176,18 @@ async def create_review(
     review_dict["created_at"] = datetime.utcnow()
     review_dict["updated_at"] = datetime.utcnow()
 
-    result = await db.reviews.insert_one(review_dict)
-    review_dict["_id"] = str(result.inserted_id)
+    result = await db_call(lambda: db.reviews.insert_one(review_dict))
+    review_dict["_id"] = result.inserted_id
+    snapshot_refresher.mark(REVIEWS)
 
-    return review_dict
+    return model_response(
+        ReviewAdapter,
+        ReviewAdapter.validate_python(review_dict),
+        status_code=status.HTTP_201_CREATED,
+    )
 
 
-@router.put("/{review_id}")
+@router.put("/{review_id}", response_model=ReviewResponse)
 async def update_review(
     review_id: str, review: ReviewUpdate, username: str = Depends(verify_credentials)
 ):
@@ -80,15 +200,20 @@ async def update_review(
     update_data = {k: v for k, v in review.model_dump().items() if v is not None}
     update_data["updated_at"] = datetime.utcnow()
 
-    result = await db.reviews.update_one(
-        {"_id": ObjectId(review_id)}, {"$set": update_data}
+    result = await db_call(
+        lambda: db.reviews.update_one(
+            {"_id": ObjectId(review_id)}, {"$set": update_data}
+        )
     )
 
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Review not found")
 
-    updated_review = await db.reviews.find_one({"_id": ObjectId(review_id)})
-    return serialize_review(updated_review)
+    snapshot_refresher.mark(REVIEWS)
+    updated_review = await db_call(
+        lambda: db.reviews.find_one({"_id": ObjectId(review_id)})
+    )
+    return model_response(ReviewAdapter, ReviewAdapter.validate_python(updated_review))
 
 
 @router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -99,7 +224,9 @@ async def delete_review(review_id: str, username: str = Depends(verify_credentia
     if not ObjectId.is_valid(review_id):
         raise HTTPException(status_code=400, detail="Invalid review ID")
 
-    result = await db.reviews.delete_one({"_id": ObjectId(review_id)})
+    result = await db_call(lambda: db.reviews.delete_one({"_id": ObjectId(review_id)}))
 
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Review not found")
+
+    snapshot_refresher.mark(REVIEWS)
@@ -1,22 +1,25 @@
-from fastapi import APIRouter, Depends
-from typing import List
+from fastapi import APIRouter, Depends, Header, Response
+from typing import List, Optional
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from app.config.database import get_database
 from app.models.settings import SiteSettings, CarouselSlide, FeatureCard
 from app.auth.basic_auth import verify_credentials
+from app.utils.concurrency import (
+    parse_if_match,
+    version_filter,
+    etag,
+    precondition_failed,
+)
+from app.services.resilience import db_call, cached_read, stale_headers
+from app.services.snapshots import snapshot_refresher, SITE_SETTINGS
 
 router = APIRouter(prefix="/settings", tags=["Settings"])
 
 
-@router.get("")
-async def get_settings():
-    """Get site settings"""
-    db = get_database()
-    settings = await db.settings.find_one({"type": "site_settings"})
-
-    if not settings:
-        # Return default settings
-        return SiteSettings().model_dump()
-
+def serialize_settings(settings) -> dict:
+    """Convert the site settings document to response format"""
     return {
         "whatsapp": settings.get("whatsapp", ""),
         "instagram": settings.get("instagram", ""),
@@ -26,30 +29,98 @@ async def get_settings():
         "hero_title": settings.get("hero_title", ""),
         "hero_subtitle": settings.get("hero_subtitle", ""),
         "footer_text": settings.get("footer_text", ""),
+        "version": settings.get("version", 0),
     }
 
 
+@router.get("")
+async def get_settings(response: Response):
+    """Get site settings"""
+    db = get_database()
+    settings, stale = await cached_read(
+        "settings:site", lambda: db.settings.find_one({"type": "site_settings"})
+    )
+    response.headers.update(stale_headers(stale))
+
+    if not settings:
+        # Return default settings
+        response.headers["ETag"] = etag(0)
+        return {**SiteSettings().model_dump(), "version": 0}
+
+    response.headers["ETag"] = etag(settings.get("version"))
+    return serialize_settings(settings)
+
+
 @router.put("")
 async def update_settings(
-    settings_data: SiteSettings, username: str = Depends(verify_credentials)
+    settings_data: SiteSettings,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    username: str = Depends(verify_credentials),
 ):
-    """Update site settings (Admin only)"""
+    """Update site settings (Admin only)
+
+    Send the settings' ETag in `If-Match` to only apply the update if nobody
+    else changed them in the meantime (412 otherwise).
+    """
     db = get_database()
 
-    await db.settings.update_one(
-        {"type": "site_settings"},
-        {"$set": {**settings_data.model_dump(), "type": "site_settings"}},
-        upsert=True,
+    expected_version = parse_if_match(if_match)
+
+    query = {"type": "site_settings"}
+    if expected_version is not None:
+        query.update(version_filter(expected_version))
+
+    values = {
+        **settings_data.model_dump(),
+        "type": "site_settings",
+        "updated_at": datetime.utcnow(),
+    }
+
+    # Conditional updates never upsert: a version mismatch would otherwise
+    # insert a second site_settings document.
+    settings = await db_call(
+        lambda: db.settings.find_one_and_update(
+            query,
+            {"$set": values, "$inc": {"version": 1}},
+            upsert=expected_version is None,
+            return_document=ReturnDocument.AFTER,
+        )
     )
 
-    return settings_data
+    if not settings and expected_version == 0:
+        # `"0"` is the ETag of the defaults shown before the first save:
+        # create the document, but only if nobody else has meanwhile. The
+        # unique index on `type` stops two concurrent first saves.
+        try:
+            result = await db_call(
+                lambda: db.settings.update_one(
+                    {"type": "site_settings"},
+                    {"$setOnInsert": {**values, "version": 1}},
+                    upsert=True,
+                )
+            )
+        except DuplicateKeyError:
+            result = None
+        if result is not None and result.upserted_id is not None:
+            settings = {**values, "version": 1}
+
+    if not settings:
+        raise precondition_failed("Settings")
+
+    snapshot_refresher.mark(SITE_SETTINGS)
+    response.headers["ETag"] = etag(settings["version"])
+    return serialize_settings(settings)
 
 
 @router.get("/carousel")
-async def get_carousel():
+async def get_carousel(response: Response):
     """Get carousel slides"""
     db = get_database()
-    carousel = await db.settings.find_one({"type": "carousel"})
+    carousel, stale = await cached_read(
+        "settings:carousel", lambda: db.settings.find_one({"type": "carousel"})
+    )
+    response.headers.update(stale_headers(stale))
 
     if not carousel:
         return []
@@ -66,20 +137,32 @@ async def update_carousel(
 
     slides_data = [slide.model_dump() for slide in slides]
 
-    await db.settings.update_one(
-        {"type": "carousel"},
-        {"$set": {"type": "carousel", "slides": slides_data}},
-        upsert=True,
+    await db_call(
+        lambda: db.settings.update_one(
+            {"type": "carousel"},
+            {
+                "$set": {
+                    "type": "carousel",
+                    "slides": slides_data,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+            upsert=True,
+        )
     )
 
+    snapshot_refresher.mark(SITE_SETTINGS)
     return slides_data
 
 
 @router.get("/features")
-async def get_features():
+async def get_features(response: Response):
     """Get feature cards for About section"""
     db = get_database()
-    features = await db.settings.find_one({"type": "features"})
+    features, stale = await cached_read(
+        "settings:features", lambda: db.settings.find_one({"type": "features"})
+    )
+    response.headers.update(stale_headers(stale))
 
     if not features:
         # Return default feature cards
@@ -128,10 +211,19 @@ async def update_features(
 
     cards_data = [card.model_dump() for card in cards]
 
-    await db.settings.update_one(
-        {"type": "features"},
-        {"$set": {"type": "features", "cards": cards_data}},
-        upsert=True,
+    await db_call(
+        lambda: db.settings.update_one(
+            {"type": "features"},
+            {
+                "$set": {
+                    "type": "features",
+                    "cards": cards_data,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+            upsert=True,
+        )
     )
 
+    snapshot_refresher.mark(SITE_SETTINGS)
     return cards_data
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status
 from fastapi.responses import JSONResponse
+import asyncio
 import cloudinary
 import cloudinary.uploader
 from app.config.settings import settings
 from app.auth.basic_auth import verify_credentials
+from app.models.job import JobAccepted
+from app.services.jobs import job_queue
+from app.services.resilience import db_call
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
@@ -57,14 +61,27 @@ async def upload_image(
         raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(e)}")
 
 
-@router.delete("/{public_id:path}")
+@job_queue.handler("images.delete")
+async def delete_image_job(payload: dict):
+    """Delete an image from Cloudinary; raising makes the job retry"""
+    result = await asyncio.to_thread(cloudinary.uploader.destroy, payload["public_id"])
+    # "not found" means an earlier attempt already deleted it
+    if result.get("result") not in ("ok", "not found"):
+        raise RuntimeError(f"Cloudinary returned {result.get('result')!r}")
+    return {"result": result["result"]}
+
+
+@router.delete(
+    "/{public_id:path}",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobAccepted,
+)
 async def delete_image(public_id: str, username: str = Depends(verify_credentials)):
-    """Delete an image from Cloudinary (Admin only)"""
-    try:
-        result = cloudinary.uploader.destroy(public_id)
-        if result.get("result") == "ok":
-            return {"message": "Image deleted successfully"}
-        else:
-            raise HTTPException(status_code=400, detail="Failed to delete image")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to delete image: {str(e)}")
+    """Queue an image for deletion from Cloudinary (Admin only)
+
+    Poll GET /api/jobs/{job_id} to see when it is done.
+    """
+    job_id = await db_call(
+        lambda: job_queue.enqueue("images.delete", {"public_id": public_id})
+    )
+    return {"message": "Image deletion queued", "job_id": job_id}
@@ -0,0 +1,48 @@
+"""
+Production entry point: runs the API on several uvicorn worker processes.
+Run: python -m app.server
+
+Each worker is a freshly spawned process that imports `app.main:app` and
+runs its own lifespan, so every worker opens its own MongoDB client.
+On SIGTERM/SIGINT the parent signals every worker; each one stops accepting
+connections, waits up to `graceful_shutdown_timeout` seconds for in-flight
+requests to finish and only then closes its MongoDB client.
+"""
+
+import importlib.util
+import os
+
+import uvicorn
+
+from app.config.settings import settings
+
+
+def worker_count() -> int:
+    """Number of worker processes (defaults to the number of CPU cores)"""
+    if settings.workers > 0:
+        return settings.workers
+    return os.cpu_count() or 1
+
+
+def main():
+    # uvloop/httptools ship with uvicorn[standard] but are not available everywhere
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+
+    uvicorn.run(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=worker_count(),
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+        timeout_keep_alive=settings.keep_alive_timeout,
+        proxy_headers=True,
+        access_log=False,  # the app writes its own sampled access log
+        log_level="debug" if settings.debug else "info",
+    )
+
+
+if __name__ == "__main__":
+    main()
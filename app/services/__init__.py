@@ -0,0 +1 @@
+# Empty file to make services a package
@@ -0,0 +1,90 @@
+"""
+Request IDs and sampled access logs.
+
+`RequestLogMiddleware` gives every request an id (the caller's
+`X-Request-ID` if it sent a sane one) and stores it in `request_id_var`, so
+anything logged while handling the request is tagged with it; it is also
+returned as the `X-Request-ID` response header.
+
+One access log line is written for every server error and every request
+slower than `access_log_slow_ms`; other requests are sampled at
+`access_log_sample_rate`. Each line records the rate it was sampled at so
+counts can be scaled back up.
+"""
+
+import logging
+import random
+import re
+import time
+import uuid
+
+from app.config.logging_config import request_id_var
+from app.config.settings import settings
+
+logger = logging.getLogger("app.access")
+
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+def _request_id(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            if VALID_REQUEST_ID.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex
+
+
+class RequestLogMiddleware:
+    """Pure ASGI middleware: sets the request id and writes the access log"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _request_id(scope)
+        token = request_id_var.set(request_id)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self._log(scope, status_code, duration_ms)
+            request_id_var.reset(token)
+
+    def _log(self, scope, status_code: int, duration_ms: float):
+        if status_code >= 500 or duration_ms >= settings.access_log_slow_ms:
+            sample_rate = 1.0
+        else:
+            sample_rate = settings.access_log_sample_rate
+            # Skipped requests cost one random() call and nothing else
+            if sample_rate <= 0 or random.random() >= sample_rate:
+                return
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        logger.info(
+            "request",
+            extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(duration_ms, 2),
+                "sample_rate": sample_rate,
+            },
+        )
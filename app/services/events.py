@@ -0,0 +1,182 @@
+"""
+Live catalog updates for GET /api/events.
+
+A single watcher per process follows the `products`, `reviews` and
+`settings` collections and fans every change out to the connected clients.
+It uses MongoDB change streams when the deployment supports them (replica
+sets, Atlas) and otherwise polls `updated_at`. `updated_at` is stamped
+before the write commits, so each poll looks back `events_poll_overlap`
+seconds past the newest change it has seen and skips the ones it already
+published; a write that takes longer than that to become visible (or comes
+from a host whose clock is further behind) is still missed. Product
+deletions are picked up from their tombstones, but review and settings
+deletions leave no trace and are not reported. The watcher only runs while
+at least one client is connected.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.config.database import get_database
+from app.config.settings import settings
+
+WATCHED_COLLECTIONS = ["products", "reviews", "settings"]
+
+# Sent to a client whose queue overflowed: it missed events and must refetch
+RESYNC_EVENT = {"operation": "resync"}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def format_sse(event: dict) -> str:
+    """Encode an event as a server-sent events message"""
+    return f"event: change\ndata: {json.dumps(event, default=_json_default)}\n\n"
+
+
+def make_event(collection: str, operation: str, doc_id, document=None) -> dict:
+    return {
+        "collection": collection,
+        "operation": operation,
+        "id": str(doc_id),
+        "document": document,
+    }
+
+
+class EventBroker:
+    """Fans out collection changes to per-client bounded queues"""
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=settings.events_queue_size)
+        self.subscribers.add(queue)
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self._watcher:
+            self._watcher.cancel()
+            self._watcher = None
+
+    def publish(self, event: dict):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A slow client never blocks the others: drop its backlog
+                # and tell it to refetch instead.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC_EVENT)
+
+    async def close(self):
+        if self._watcher:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+        self.subscribers.clear()
+
+    async def _watch(self):
+        if settings.change_streams_enabled:
+            try:
+                await self._watch_change_streams()
+                return
+            except OperationFailure:
+                # Standalone servers don't support change streams
+                pass
+        await self._poll()
+
+    async def _watch_change_streams(self):
+        db = get_database()
+        pipeline = [{"$match": {"ns.coll": {"$in": WATCHED_COLLECTIONS}}}]
+        resume_token = None
+
+        while True:
+            try:
+                async with db.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        operation = change["operationType"]
+                        if operation not in ("insert", "update", "replace", "delete"):
+                            continue
+                        self.publish(
+                            make_event(
+                                change["ns"]["coll"],
+                                "delete" if operation == "delete" else "upsert",
+                                change["documentKey"]["_id"],
+                                change.get("fullDocument"),
+                            )
+                        )
+            except OperationFailure:
+                if resume_token is None:
+                    raise
+                # Resume token no longer in the oplog: clients must refetch
+                resume_token = None
+                self.publish(RESYNC_EVENT)
+            except PyMongoError:
+                # Transient network error: the driver resumes from the token
+                await asyncio.sleep(settings.events_poll_interval)
+
+    async def _poll(self):
+        db = get_database()
+        overlap = timedelta(seconds=settings.events_poll_overlap)
+        now = datetime.utcnow()
+        # Deleted products leave tombstones (see delete_product)
+        sources = WATCHED_COLLECTIONS + ["product_tombstones"]
+        last_seen = {name: now for name in sources}
+        # (_id, updated_at) of changes published within the overlap window
+        published = {name: set() for name in sources}
+
+        while True:
+            await asyncio.sleep(settings.events_poll_interval)
+            for name in sources:
+                seen = published[name]
+                try:
+                    changed = (
+                        await db[name]
+                        .find({"updated_at": {"$gt": last_seen[name] - overlap}})
+                        .sort("updated_at", 1)
+                        # Already published changes come back too; leave room
+                        # for 500 new ones so the poll always moves forward
+                        .limit(len(seen) + 500)
+                        .to_list(None)
+                    )
+                except PyMongoError:
+                    continue
+                for document in changed:
+                    key = (document["_id"], document["updated_at"])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    last_seen[name] = max(last_seen[name], document["updated_at"])
+                    if name == "product_tombstones":
+                        self.publish(make_event("products", "delete", document["_id"]))
+                    else:
+                        self.publish(
+                            make_event(name, "upsert", document["_id"], document)
+                        )
+                cutoff = last_seen[name] - overlap
+                published[name] = {key for key in seen if key[1] > cutoff}
+
+
+event_broker = EventBroker()
@@ -0,0 +1,261 @@
+"""
+Background jobs for slow admin side effects.
+
+Routes call `job_queue.enqueue(job_type, payload)` and return straight
+away. The job is stored in the `jobs` collection first, so it survives a
+restart, and each worker process runs a dispatcher that claims queued jobs
+and runs up to `job_concurrency` of them at once.
+
+A claimed job holds a lease of `job_lease_seconds`; if its worker dies the
+lease runs out and another worker picks it up again, unless the job has
+used all its attempts, in which case it is marked `failed`. Handlers are
+cancelled after `job_timeout_seconds`, which is shorter than the lease, but
+work they hand to a thread (`asyncio.to_thread`) keeps running, so a job can
+run twice at once and handlers must be idempotent. Only the worker that
+still holds the lease records the outcome. A failing handler is retried
+with exponential backoff until `job_max_attempts`, then the job is marked
+`failed`. Finished jobs are removed after `job_retention_days`.
+
+Handlers are registered where the work lives:
+
+    @job_queue.handler("images.delete")
+    async def delete_image_job(payload: dict):
+        ...
+"""
+
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.config.database import get_database
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+Handler = Callable[[dict], Awaitable[Optional[dict]]]
+
+
+class UnknownJobType(Exception):
+    """No handler is registered for this job type"""
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff (with jitter) before retry number `attempts`"""
+    ceiling = min(
+        settings.job_retry_base_delay * 2 ** (attempts - 1),
+        settings.job_retry_max_delay,
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+class JobQueue:
+    """Durable job queue with a per-process dispatcher"""
+
+    def __init__(self):
+        self.handlers: Dict[str, Handler] = {}
+        self.running: Set[asyncio.Task] = set()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def handler(self, job_type: str):
+        """Register the coroutine function that runs jobs of `job_type`"""
+
+        def register(func: Handler) -> Handler:
+            self.handlers[job_type] = func
+            return func
+
+        return register
+
+    async def enqueue(
+        self, job_type: str, payload: dict, max_attempts: Optional[int] = None
+    ) -> str:
+        """Store a job and wake the dispatcher; returns the job id"""
+        if job_type not in self.handlers:
+            raise UnknownJobType(job_type)
+        now = datetime.utcnow()
+        job = {
+            "type": job_type,
+            "payload": payload,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts or settings.job_max_attempts,
+            "run_at": now,
+            "lease_expires_at": None,
+            "last_error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None,
+        }
+        result = await get_database().jobs.insert_one(job)
+        if self._wakeup:
+            self._wakeup.set()
+        return str(result.inserted_id)
+
+    async def get(self, job_id: ObjectId) -> Optional[dict]:
+        return await get_database().jobs.find_one({"_id": job_id})
+
+    def start(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(settings.job_concurrency)
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def close(self):
+        """Stop claiming jobs and cancel the ones in flight.
+
+        Cancelled jobs keep their lease and are retried once it expires.
+        """
+        tasks = list(self.running)
+        if self._dispatcher:
+            tasks.append(self._dispatcher)
+            self._dispatcher = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.running.clear()
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        jobs = get_database().jobs
+        expired = {"status": RUNNING, "lease_expires_at": {"$lte": now}}
+        out_of_attempts = {"$expr": {"$gte": ["$attempts", "$max_attempts"]}}
+        # A worker died (or hung) on the last attempt: give up instead of
+        # running the job forever
+        await jobs.update_many(
+            {**expired, **out_of_attempts},
+            {
+                "$set": {
+                    "status": FAILED,
+                    "last_error": "Lease expired on the last attempt",
+                    "lease_expires_at": None,
+                    "updated_at": now,
+                    "finished_at": now,
+                }
+            },
+        )
+        return await jobs.find_one_and_update(
+            {
+                "type": {"$in": list(self.handlers)},
+                "$or": [
+                    {"status": QUEUED, "run_at": {"$lte": now}},
+                    # A worker died (or was stopped) while running this job
+                    {
+                        **expired,
+                        "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+                    },
+                ],
+            },
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "lease_expires_at": now
+                    + timedelta(seconds=settings.job_lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("run_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await self._claim()
+            except PyMongoError:
+                job = None
+            if job is None:
+                self._slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), settings.job_poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.create_task(self._run(job))
+            self.running.add(task)
+            task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        self.running.discard(task)
+        self._slots.release()
+
+    async def _run(self, job: dict):
+        handler = self.handlers[job["type"]]
+        try:
+            result = await asyncio.wait_for(
+                handler(job["payload"]), settings.job_timeout_seconds
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            now = datetime.utcnow()
+            error = str(exc) or type(exc).__name__
+            details = {
+                "job_id": str(job["_id"]),
+                "job_type": job["type"],
+                "attempts": job["attempts"],
+            }
+            if job["attempts"] >= job["max_attempts"]:
+                update = {"status": FAILED, "finished_at": now}
+                logger.error("Job failed", exc_info=True, extra=details)
+            else:
+                run_at = now + timedelta(seconds=retry_delay(job["attempts"]))
+                update = {"status": QUEUED, "run_at": run_at}
+                logger.warning(
+                    "Job failed, will retry", extra={**details, "error": error}
+                )
+            update.update(last_error=error, lease_expires_at=None, updated_at=now)
+            await self._record(job, update)
+            return
+
+        now = datetime.utcnow()
+        await self._record(
+            job,
+            {
+                "status": SUCCEEDED,
+                "result": result,
+                "lease_expires_at": None,
+                "updated_at": now,
+                "finished_at": now,
+            },
+        )
+
+    async def _record(self, job: dict, update: dict):
+        """Save a job's outcome; if that fails the lease expiry retries it"""
+        details = {"job_id": str(job["_id"]), "status": update["status"]}
+        try:
+            result = await get_database().jobs.update_one(
+                # Only while this worker still holds the lease: after it
+                # expired another worker may own the job
+                {
+                    "_id": job["_id"],
+                    "status": RUNNING,
+                    "lease_expires_at": job["lease_expires_at"],
+                },
+                {"$set": update},
+            )
+        except PyMongoError:
+            logger.error("Could not record job outcome", exc_info=True, extra=details)
+            return
+        if result.matched_count == 0:
+            logger.warning("Lease lost, job outcome discarded", extra=details)
+
+
+job_queue = JobQueue()
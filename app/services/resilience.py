@@ -0,0 +1,152 @@
+"""
+Keep the API responsive when MongoDB is slow or down.
+
+Every database call goes through `db_call`, which enforces a deadline and
+feeds a circuit breaker. After `db_breaker_failure_threshold` consecutive
+failures the circuit opens and calls fail immediately (503) instead of
+queueing on a dead connection pool. After `db_breaker_reset_seconds` one
+trial call is let through; success closes the circuit again.
+
+Public reads use `cached_read`, which coalesces identical concurrent reads
+into one query, remembers the last good result per key and serves it
+(marked stale) while the database is unavailable.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Tuple
+
+from pymongo.errors import ConnectionFailure, ExecutionTimeout, WTimeoutError
+
+from app.config.settings import settings
+from app.services.singleflight import read_flights
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean "the database is unhealthy", as opposed to errors caused
+# by the request itself (duplicate keys, validation failures, ...)
+UNAVAILABLE_ERRORS = (
+    asyncio.TimeoutError,
+    ConnectionFailure,
+    ExecutionTimeout,
+    WTimeoutError,
+)
+
+
+class DatabaseUnavailable(Exception):
+    """The database timed out, failed, or the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.trial_in_flight:
+            return False
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            # Half-open: let exactly one call find out if the database is back
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is None and self.failures >= self.failure_threshold:
+            logger.warning("Database circuit opened", extra={"failures": self.failures})
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class StaleCache:
+    """Bounded LRU of the last good result per key"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str):
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def set(self, key: str, value: Any):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+
+db_breaker = CircuitBreaker(
+    settings.db_breaker_failure_threshold, settings.db_breaker_reset_seconds
+)
+stale_cache = StaleCache(settings.stale_cache_max_entries)
+
+
+async def db_call(operation: Callable[[], Awaitable[Any]]) -> Any:
+    """Run a database operation under the deadline and circuit breaker"""
+    if not db_breaker.allow():
+        raise DatabaseUnavailable("Circuit breaker is open")
+    try:
+        result = await asyncio.wait_for(operation(), settings.db_timeout_ms / 1000)
+    except UNAVAILABLE_ERRORS as exc:
+        db_breaker.record_failure()
+        raise DatabaseUnavailable(str(exc) or type(exc).__name__) from exc
+    except BaseException:
+        # Not a database outage (bad request, cancelled client, ...): free the
+        # half-open trial slot without changing the breaker state
+        db_breaker.trial_in_flight = False
+        raise
+    if db_breaker.is_open:
+        logger.info("Database circuit closed")
+    db_breaker.record_success()
+    return result
+
+
+async def cached_read(
+    key: str, operation: Callable[[], Awaitable[Any]]
+) -> Tuple[Any, bool]:
+    """Run a public read; returns (result, is_stale).
+
+    `key` identifies the query (route plus normalized parameters): concurrent
+    calls with the same key share one database round trip. While the
+    database is unavailable the last good result for `key` is returned with
+    is_stale=True. Without one, DatabaseUnavailable propagates.
+
+    The result may be shared between requests and must not be mutated.
+    """
+    try:
+        result = await read_flights.do(key, lambda: db_call(operation))
+    except DatabaseUnavailable:
+        if key in stale_cache:
+            return stale_cache.get(key), True
+        raise
+    stale_cache.set(key, result)
+    return result, False
+
+
+def stale_headers(is_stale: bool) -> dict:
+    """Response headers flagging a result served from the stale cache"""
+    if not is_stale:
+        return {}
+    return {"X-Cache": "stale", "Warning": '110 - "Response is Stale"'}
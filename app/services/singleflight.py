@@ -0,0 +1,39 @@
+"""
+Request coalescing for identical concurrent reads.
+
+When many requests ask for the same thing at once (a cold cache, a viral
+product page), only the first one runs the query; the others await the
+same in-flight task and share its result. Coalescing is per process and
+only covers calls that overlap in time: nothing is cached afterwards.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, operation: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `operation` once for all concurrent callers with the same key"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(operation())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # shield: one caller disconnecting must not cancel the query for the rest
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+read_flights = SingleFlight()
@@ -0,0 +1,507 @@
+"""
+Pre-rendered catalog snapshots.
+
+The public read endpoints are rendered into JSON files (plus gzipped
+copies) under `snapshot_dir/<version>/`, mirroring their URLs:
+
+    api/products.json              GET /api/products
+    api/products/featured.json     GET /api/products/featured
+    api/products/<id>.json         GET /api/products/{id}
+    api/reviews/featured.json      GET /api/reviews/featured
+    api/settings.json              GET /api/settings
+    api/settings/carousel.json     GET /api/settings/carousel
+    api/settings/features.json     GET /api/settings/features
+
+`snapshot_dir/CURRENT` names the live version and is switched atomically.
+Admin writes mark what they touched and a debounced incremental rebuild
+hard-links every untouched file into a new version and re-renders only the
+rest. With SERVE_SNAPSHOTS=true, `SnapshotMiddleware` answers those GETs
+from the files and never touches MongoDB.
+
+Rebuilds run as background jobs on whichever instance claims them, so when
+the API runs on several machines they must all share one `snapshot_dir`
+(e.g. an NFS mount); a local directory would only be updated on one of them.
+
+Build from the command line (e.g. in CI before deploying):
+    python -m app.services.snapshots
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from fastapi import Response
+from fastapi.responses import FileResponse, JSONResponse
+
+from app.config.database import get_database
+from app.config.settings import settings
+from app.models.product import ProductAdapter
+from app.utils.concurrency import etag
+from app.services.jobs import job_queue
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+# Rebuild targets
+PRODUCT_LISTS = "products"
+REVIEWS = "reviews"
+SITE_SETTINGS = "settings"
+
+STATIC_FILES = {
+    PRODUCT_LISTS: ["api/products.json", "api/products/featured.json"],
+    REVIEWS: ["api/reviews/featured.json"],
+    SITE_SETTINGS: [
+        "api/settings.json",
+        "api/settings/carousel.json",
+        "api/settings/features.json",
+    ],
+}
+
+PRODUCT_PATH = re.compile(r"^/api/products/([0-9a-fA-F]{24})$")
+
+# Products rendered and written per worker-thread call
+WRITE_BATCH_SIZE = 500
+
+
+class SnapshotBuildError(Exception):
+    """Rendering failed or the database served stale data"""
+
+
+def product_file(product_id) -> str:
+    return f"api/products/{product_id}.json"
+
+
+def _checked(response: Response) -> dict:
+    """Headers to serve with the snapshot (the route's ETag, if any)"""
+    # Never bake a stale fallback response into a snapshot
+    if response.headers.get("x-cache") == "stale":
+        raise SnapshotBuildError("Database unavailable, refusing to snapshot")
+    return {"ETag": response.headers["etag"]} if "etag" in response.headers else {}
+
+
+async def _render_static(relative_path: str) -> Tuple[bytes, dict]:
+    """Call the live route; returns (body, headers)"""
+    # Imported here: the route modules import this module to mark changes
+    from app.routes import products, reviews, settings as settings_routes
+
+    routes = {
+        "api/products.json": products.get_all_products,
+        "api/products/featured.json": products.get_featured_products,
+        "api/reviews/featured.json": lambda: reviews.get_featured_reviews(
+            reviews.FEATURED_REVIEWS_LIMIT
+        ),
+    }
+    if relative_path in routes:
+        response = await routes[relative_path]()
+        return response.body, _checked(response)
+
+    handlers = {
+        "api/settings.json": settings_routes.get_settings,
+        "api/settings/carousel.json": settings_routes.get_carousel,
+        "api/settings/features.json": settings_routes.get_features,
+    }
+    response = Response()
+    content = await handlers[relative_path](response)
+    return JSONResponse(content).body, _checked(response)
+
+
+def _write_products(version_dir: str, products: List[dict]) -> Dict[str, dict]:
+    """Render and write product files; returns their manifest entries"""
+    manifest = {}
+    for product in products:
+        relative_path = product_file(product["_id"])
+        # Same serialization as GET /api/products/{id}
+        body = ProductAdapter.dump_json(
+            ProductAdapter.validate_python(product), by_alias=True
+        )
+        manifest[relative_path] = _write(
+            version_dir, relative_path, body, {"ETag": etag(product.get("version"))}
+        )
+    return manifest
+
+
+async def _write_all_products(version_dir: str, cursor) -> Dict[str, dict]:
+    manifest = {}
+    batch = []
+    async for product in cursor:
+        batch.append(product)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            manifest.update(
+                await asyncio.to_thread(_write_products, version_dir, batch)
+            )
+            batch = []
+    if batch:
+        manifest.update(await asyncio.to_thread(_write_products, version_dir, batch))
+    return manifest
+
+
+def _write(version_dir: str, relative_path: str, body: bytes, headers=None) -> dict:
+    """Write body and its gzipped copy; returns the manifest entry"""
+    path = os.path.join(version_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write-then-rename: the old name may be a hard link shared with the
+    # previous version, which must never change under a reader.
+    for target, data in ((path, body), (path + ".gz", gzip.compress(body, mtime=0))):
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+    return {"headers": headers or {}}
+
+
+def _link_tree(source: str, destination: str, skip: Set[str]):
+    """Hard-link every file of the previous version except those in `skip`"""
+    for root, _dirs, files in os.walk(source):
+        for name in files:
+            if name == MANIFEST_FILE:
+                continue
+            src = os.path.join(root, name)
+            relative = os.path.relpath(src, source).replace(os.sep, "/")
+            if relative in skip or relative.removesuffix(".gz") in skip:
+                continue
+            dst = os.path.join(destination, relative)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            try:
+                os.link(src, dst)
+            except OSError:
+                # Filesystems without hard links (or across devices)
+                shutil.copy2(src, dst)
+
+
+def current_version() -> Optional[str]:
+    try:
+        with open(os.path.join(settings.snapshot_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _load_manifest(version: str) -> Dict[str, dict]:
+    path = os.path.join(settings.snapshot_dir, version, MANIFEST_FILE)
+    with open(path) as f:
+        return json.load(f)
+
+
+def _activate(version: str, manifest: Dict[str, dict]):
+    version_dir = os.path.join(settings.snapshot_dir, version)
+    with open(os.path.join(version_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    pointer = os.path.join(settings.snapshot_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    _prune(keep=version)
+
+
+def _prune(keep: str):
+    versions = sorted(
+        name
+        for name in os.listdir(settings.snapshot_dir)
+        if os.path.isdir(os.path.join(settings.snapshot_dir, name))
+    )
+    # Old versions stay around briefly for requests still reading them
+    for name in versions[: -settings.snapshot_keep_versions]:
+        if name != keep:
+            shutil.rmtree(os.path.join(settings.snapshot_dir, name), ignore_errors=True)
+
+
+@asynccontextmanager
+async def _build_lock():
+    """Serialize builds across worker processes sharing the snapshot dir.
+
+    Two concurrent incremental builds would both start from the same
+    version and the second to finish would drop the first one's changes.
+    """
+    os.makedirs(settings.snapshot_dir, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(settings.snapshot_dir, ".lock"), "w") as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _new_version_dir() -> tuple:
+    version = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    version_dir = os.path.join(settings.snapshot_dir, version)
+    os.makedirs(version_dir)
+    return version, version_dir
+
+
+async def build_full() -> str:
+    """Render every public read endpoint into a new version"""
+    async with _build_lock():
+        return await _build_full()
+
+
+async def _write_static(version_dir: str, paths: Iterable[str]) -> Dict[str, dict]:
+    manifest = {}
+    for relative_path in paths:
+        body, headers = await _render_static(relative_path)
+        manifest[relative_path] = await asyncio.to_thread(
+            _write, version_dir, relative_path, body, headers
+        )
+    return manifest
+
+
+# Builds only touch the filesystem through worker threads: with a large
+# catalog, linking and writing files would otherwise stall every request
+# handled by this worker.
+
+
+async def _build_full() -> str:
+    db = get_database()
+    version, version_dir = await asyncio.to_thread(_new_version_dir)
+
+    try:
+        static_paths = [path for paths in STATIC_FILES.values() for path in paths]
+        manifest = await _write_static(version_dir, static_paths)
+        manifest.update(await _write_all_products(version_dir, db.products.find()))
+    except BaseException:
+        await asyncio.to_thread(shutil.rmtree, version_dir, ignore_errors=True)
+        raise
+
+    await asyncio.to_thread(_activate, version, manifest)
+    return version
+
+
+async def build_incremental(targets: Iterable[str]) -> str:
+    """Re-render only the files affected by `targets` into a new version.
+
+    Targets are PRODUCT_LISTS, REVIEWS, SITE_SETTINGS or a product id.
+    Falls back to a full build when there is no current version yet.
+    """
+    async with _build_lock():
+        previous = await asyncio.to_thread(current_version)
+        if previous is None:
+            return await _build_full()
+        return await _build_incremental(previous, set(targets))
+
+
+async def _build_incremental(previous: str, targets: Set[str]) -> str:
+    product_ids = [ObjectId(t) for t in targets if ObjectId.is_valid(t)]
+    static_paths = [
+        path
+        for target, paths in STATIC_FILES.items()
+        if target in targets
+        for path in paths
+    ]
+    changed = set(static_paths) | {product_file(pid) for pid in product_ids}
+
+    db = get_database()
+    version, version_dir = await asyncio.to_thread(_new_version_dir)
+    previous_manifest = await asyncio.to_thread(_load_manifest, previous)
+    manifest = {
+        path: entry for path, entry in previous_manifest.items() if path not in changed
+    }
+
+    try:
+        await asyncio.to_thread(
+            _link_tree,
+            os.path.join(settings.snapshot_dir, previous),
+            version_dir,
+            changed,
+        )
+        manifest.update(await _write_static(version_dir, static_paths))
+        if product_ids:
+            # Deleted products simply aren't found and drop out of the snapshot
+            manifest.update(
+                await _write_all_products(
+                    version_dir, db.products.find({"_id": {"$in": product_ids}})
+                )
+            )
+    except BaseException:
+        await asyncio.to_thread(shutil.rmtree, version_dir, ignore_errors=True)
+        raise
+
+    await asyncio.to_thread(_activate, version, manifest)
+    return version
+
+
+@job_queue.handler("snapshots.rebuild")
+async def rebuild_snapshot_job(payload: dict):
+    """Background job: incremental rebuild; failures retry with backoff"""
+    return {"version": await build_incremental(payload["targets"])}
+
+
+class SnapshotRefresher:
+    """Collects targets touched by admin writes and queues a rebuild.
+
+    Bursts of writes within `snapshot_rebuild_delay` seconds share one
+    incremental rebuild job.
+    """
+
+    def __init__(self):
+        self.pending: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def mark(self, *targets: str):
+        if not settings.snapshots_enabled:
+            return
+        self.pending.update(str(t) for t in targets)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        # Keeps going while targets are pending: marks made during the
+        # enqueue, or a failed enqueue, get another round
+        while self.pending:
+            await asyncio.sleep(settings.snapshot_rebuild_delay)
+            targets, self.pending = self.pending, set()
+            try:
+                await job_queue.enqueue(
+                    "snapshots.rebuild", {"targets": sorted(targets)}
+                )
+            except Exception:
+                # The old snapshot stays live until a later round succeeds
+                logger.warning("Could not queue snapshot rebuild", exc_info=True)
+                self.pending.update(targets)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+snapshot_refresher = SnapshotRefresher()
+
+
+class _ServedFile:
+    __slots__ = ("path", "stat", "gz_path", "gz_stat", "headers")
+
+    def __init__(self, path: str, headers: dict):
+        self.path = path
+        self.stat = os.stat(path)
+        self.gz_path = path + ".gz"
+        self.gz_stat = os.stat(self.gz_path)
+        self.headers = headers
+
+
+def _load_served_files(version: Optional[str]) -> Dict[str, _ServedFile]:
+    files = {}
+    if version:
+        version_dir = os.path.join(settings.snapshot_dir, version)
+        for relative_path, entry in _load_manifest(version).items():
+            url = "/" + relative_path.removesuffix(".json")
+            files[url] = _ServedFile(
+                os.path.join(version_dir, relative_path), entry["headers"]
+            )
+    return files
+
+
+class SnapshotMiddleware:
+    """Serve public GETs straight from the current snapshot files.
+
+    Version directories are immutable, so file stats are read once per
+    version, in a worker thread; until a new version is loaded the previous
+    one keeps being served. Requests without a snapshot file fall through
+    to the app.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._version = None
+        self._files: Dict[str, _ServedFile] = {}
+        self._checked_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def _maybe_refresh(self, now: float):
+        # Re-read the CURRENT pointer at most once per second
+        if now - self._checked_at < 1.0 or self._refreshing is not None:
+            return
+        self._checked_at = now
+        self._refreshing = asyncio.create_task(self._refresh())
+
+    async def _refresh(self):
+        try:
+            version = await asyncio.to_thread(current_version)
+            if version != self._version:
+                files = await asyncio.to_thread(_load_served_files, version)
+                self._version, self._files = version, files
+        except (OSError, ValueError):
+            # Pruned or half-written under us: try again on the next check
+            logger.warning("Could not load snapshot", exc_info=True)
+        finally:
+            self._refreshing = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+
+        path = scope["path"].rstrip("/")
+        match = PRODUCT_PATH.match(path)
+        if match:
+            path = f"/api/products/{match.group(1).lower()}"
+
+        self._maybe_refresh(asyncio.get_running_loop().time())
+        served = self._files.get(path)
+        if served is None or scope.get("query_string"):
+            return await self.app(scope, receive, send)
+
+        headers = {
+            **served.headers,
+            "Vary": "Accept-Encoding",
+            "X-Snapshot-Version": self._version,
+        }
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding", b"")
+        if b"gzip" in accept_encoding:
+            headers["Content-Encoding"] = "gzip"
+            file_path, stat_result = served.gz_path, served.gz_stat
+        else:
+            file_path, stat_result = served.path, served.stat
+
+        response = FileResponse(
+            file_path,
+            headers=headers,
+            media_type="application/json",
+            stat_result=stat_result,
+            method=scope["method"],
+        )
+        await response(scope, receive, send)
+
+
+async def _main():
+    from app.config.database import connect_to_mongo, close_mongo_connection
+    from app.config.logging_config import setup_logging
+
+    setup_logging()
+    await connect_to_mongo()
+    try:
+        version = await build_full()
+    finally:
+        await close_mongo_connection()
+    logger.info(
+        "Snapshot written",
+        extra={"version": version, "snapshot_dir": settings.snapshot_dir},
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
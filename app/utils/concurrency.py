@@ -0,0 +1,46 @@
+from typing import Optional
+from fastapi import HTTPException, status
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Parse an If-Match header into the expected document version.
+
+    Returns None when the header is absent or `*` (update unconditionally).
+    Accepts both strong ("3") and weak (W/"3") ETags.
+    """
+    if if_match is None:
+        return None
+    value = if_match.strip()
+    if value == "*":
+        return None
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+    if not value.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid If-Match header"
+        )
+    return int(value)
+
+
+def version_filter(expected: int) -> dict:
+    """Mongo filter matching documents at the expected version.
+
+    Documents written before versioning was introduced have no `version`
+    field and are treated as version 0.
+    """
+    if expected == 0:
+        return {"$or": [{"version": 0}, {"version": {"$exists": False}}]}
+    return {"version": expected}
+
+
+def etag(version: Optional[int]) -> str:
+    """ETag header value for a document version"""
+    return f'"{version or 0}"'
+
+
+def precondition_failed(resource: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"{resource} changed since you loaded it. Reload and try again.",
+    )
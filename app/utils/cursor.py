@@ -0,0 +1,24 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(created_at: datetime, doc_id: ObjectId) -> str:
+    """Opaque cursor for the (created_at, _id) of the last item on a page"""
+    raw = f"{created_at.isoformat()}|{doc_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, ObjectId]]:
+    """Inverse of encode_cursor; returns None for malformed cursors"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded).decode().split("|")
+        if len(parts) != 2:
+            return None
+        return datetime.fromisoformat(parts[0]), ObjectId(parts[1])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, InvalidId):
+        return None
@@ -0,0 +1,22 @@
+from typing import Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+def model_response(
+    adapter: TypeAdapter,
+    value,
+    status_code: int = 200,
+    headers: Optional[dict] = None,
+) -> Response:
+    """Serialize straight to JSON bytes with a cached TypeAdapter.
+
+    Returning a Response skips FastAPI's response_model re-validation and
+    jsonable_encoder pass; the route's response_model still documents it.
+    """
+    return Response(
+        content=adapter.dump_json(value, by_alias=True),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,37 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_sync_token(
+    updated_at: datetime, doc_id: ObjectId, issued_at: Optional[datetime] = None
+) -> str:
+    """Opaque token for the (updated_at, _id) position of the last change seen.
+
+    `issued_at` records when the client was handed the token, which is what
+    decides whether deletions it still needs may have been forgotten.
+    """
+    raw = f"{updated_at.isoformat()}|{doc_id}"
+    if issued_at is not None:
+        raw += f"|{issued_at.isoformat()}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> Optional[Tuple[datetime, ObjectId, datetime]]:
+    """Inverse of encode_sync_token; returns None for malformed tokens.
+
+    Tokens without an issue time report their position as issue time.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        parts = base64.urlsafe_b64decode(padded).decode().split("|")
+        if len(parts) not in (2, 3):
+            return None
+        updated_at = datetime.fromisoformat(parts[0])
+        issued_at = datetime.fromisoformat(parts[2]) if len(parts) == 3 else updated_at
+        return updated_at, ObjectId(parts[1]), issued_at
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, InvalidId):
+        return None
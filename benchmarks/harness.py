@@ -0,0 +1,121 @@
+"""
+Boot `app.main:app` in-process against an in-memory MongoDB stand-in
+and a fake image store, so benchmarks never touch Atlas or Cloudinary.
+
+mongomock runs every query synchronously on the event loop, which makes
+large catalogs far slower than they would be on a server. Pass a
+`mongodb_url` for a local mongod to measure those instead.
+"""
+
+import base64
+import itertools
+import logging
+from contextlib import asynccontextmanager
+
+from typing import Optional
+
+import httpx
+from mongomock.store import ServerStore
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.uri_parser import parse_uri
+
+import cloudinary.uploader
+from app.config import database
+from app.config.settings import settings
+
+BENCH_DB_NAME = "kalyani_resin_arts_bench"
+BENCH_MONGODB_URL = f"mongodb://localhost:27017/{BENCH_DB_NAME}"
+
+ADMIN_HEADERS = {
+    "Authorization": "Basic "
+    + base64.b64encode(
+        f"{settings.admin_username}:{settings.admin_password}".encode()
+    ).decode()
+}
+
+
+class BenchMongoClient(AsyncMongoMockClient):
+    """mongomock-motor client whose default database is async like Motor's
+
+    All clients share one in-memory server, like clients of one mongod.
+    """
+
+    server = ServerStore()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, _store=self.server, **kwargs)
+
+    def get_default_database(self, *args, **kwargs):
+        return self.get_database(BENCH_DB_NAME)
+
+
+class FakeImageStore:
+    """In-memory replacement for the Cloudinary uploader"""
+
+    def __init__(self):
+        self.images = {}
+        self._ids = itertools.count(1)
+
+    def upload(self, contents, folder="", **kwargs):
+        public_id = f"{folder}/bench_{next(self._ids)}"
+        self.images[public_id] = len(contents)
+        return {
+            "secure_url": f"https://images.example.com/{public_id}.jpg",
+            "public_id": public_id,
+            "width": 1200,
+            "height": 1200,
+        }
+
+    def destroy(self, public_id, **kwargs):
+        if self.images.pop(public_id, None) is None:
+            return {"result": "not found"}
+        return {"result": "ok"}
+
+
+def check_bench_url(mongodb_url: str):
+    """Refuse real databases that don't look like throwaway bench databases"""
+    # Seeding wipes the catalog, so never run against a real one by mistake
+    name = parse_uri(mongodb_url)["database"] or ""
+    if not name.endswith("_bench"):
+        raise ValueError(
+            f"Benchmark database name must end in '_bench' (got {name!r}), "
+            f"e.g. mongodb://localhost:27017/{BENCH_DB_NAME}"
+        )
+
+
+def install_fakes(mongodb_url: Optional[str] = None) -> FakeImageStore:
+    """Point the database layer and uploader at in-memory stand-ins
+
+    With `mongodb_url` the app talks to that (real) server instead.
+    """
+    if mongodb_url:
+        check_bench_url(mongodb_url)
+        settings.mongodb_url = mongodb_url
+    else:
+        # The stand-in never connects, but parsing an SRV URL would hit DNS
+        settings.mongodb_url = BENCH_MONGODB_URL
+        # mongomock has no change streams; exercise the polling fallback
+        settings.change_streams_enabled = False
+        database.AsyncIOMotorClient = BenchMongoClient
+        BenchMongoClient.server = ServerStore()
+    store = FakeImageStore()
+    cloudinary.uploader.upload = store.upload
+    cloudinary.uploader.destroy = store.destroy
+    # The client logs every request at INFO; keep the report readable
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    return store
+
+
+@asynccontextmanager
+async def booted_app(mongodb_url: Optional[str] = None):
+    """Run the app lifespan against the fakes and yield (client, db, store)"""
+    store = install_fakes(mongodb_url)
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            yield client, database.get_database(), store
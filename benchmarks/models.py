@@ -0,0 +1,101 @@
+"""
+Microbenchmark: cost of turning 100 product documents into a JSON response.
+
+Run from the project root:
+    python -m benchmarks.models
+
+Compares the original path (dicts through FastAPI's response_model=List[dict]
+validation and jsonable_encoder) with the cached TypeAdapter path the
+product routes use now (validate in pydantic-core, dump straight to JSON
+bytes) and with skipping validation through model_construct().
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import timeit
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.product import ProductListAdapter, ProductResponse
+from seed_data import generate_products
+
+
+def make_documents(count: int) -> List[dict]:
+    documents = generate_products(count)
+    for document in documents:
+        document["_id"] = ObjectId()
+        document["version"] = 1
+    return documents
+
+
+def legacy_serialize(documents: List[dict], field, loop) -> bytes:
+    """The pre-TypeAdapter route: stringify _id, validate as dicts, encode"""
+    products = []
+    for product in documents:
+        product["_id"] = str(product["_id"])
+        products.append(product)
+    content = loop.run_until_complete(
+        serialize_response(field=field, response_content=products)
+    )
+    return JSONResponse(content).body
+
+
+def validated_serialize(documents: List[dict]) -> bytes:
+    return ProductListAdapter.dump_json(
+        ProductListAdapter.validate_python(documents), by_alias=True
+    )
+
+
+def constructed_serialize(documents: List[dict]) -> bytes:
+    return ProductListAdapter.dump_json(
+        [ProductResponse.model_construct(**d) for d in documents], by_alias=True
+    )
+
+
+def main(count: int, repeat: int):
+    documents = make_documents(count)
+    legacy_field = create_response_field(name="Response", type_=List[dict])
+    loop = asyncio.new_event_loop()
+
+    cases = {
+        "legacy_dict_jsonable_encoder": lambda docs: legacy_serialize(
+            docs, legacy_field, loop
+        ),
+        "typeadapter_validate_dump": validated_serialize,
+        "model_construct_dump": constructed_serialize,
+    }
+
+    results = {}
+    for name, serialize in cases.items():
+        # Each run gets fresh documents: the legacy path mutates them in place
+        batches = [copy.deepcopy(documents) for _ in range(repeat)]
+        batch = iter(batches)
+        seconds = timeit.timeit(lambda: serialize(next(batch)), number=repeat)
+        results[name] = round(seconds / repeat * 1_000_000, 1)
+
+    loop.close()
+
+    baseline = results["legacy_dict_jsonable_encoder"]
+    report = {
+        "products_per_call": count,
+        "repeat": repeat,
+        "microseconds_per_call": results,
+        "speedup_vs_legacy": {
+            name: round(baseline / value, 2) for name, value in results.items()
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=100, help="products per call")
+    parser.add_argument("--repeat", type=int, default=200, help="calls per case")
+    args = parser.parse_args()
+    main(args.count, args.repeat)
@@ -0,0 +1,312 @@
+"""
+Load-test the public and admin endpoints against synthetic catalogs.
+
+Run from the project root:
+    python -m benchmarks.run --sizes 100,10000 --output bench.json
+    python -m benchmarks.run --baseline bench.json
+    python -m benchmarks.run --sizes 100000 \
+        --mongodb-url mongodb://localhost:27017/kalyani_resin_arts_bench
+
+Results are written as JSON with p50/p95/p99 latency, throughput and RSS
+per endpoint and catalog size. The HTTP client runs in the same process
+as the app (no sockets), so numbers measure the app plus the database,
+not the network. By default that is the in-memory stand-in, which runs
+queries synchronously on the event loop: use `--mongodb-url` with a local
+mongod for catalogs beyond ~10k products or anything query-bound.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import resource
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.harness import ADMIN_HEADERS, booted_app, check_bench_url
+from seed_data import seed_catalog
+
+DEFAULT_SIZES = [100, 10_000]
+
+
+@dataclass
+class Scenario:
+    """One endpoint to drive; `build` returns (method, url, request kwargs)"""
+
+    name: str
+    build: Callable[[], tuple]
+    admin: bool = False
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # Fall back to peak RSS (KiB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def build_scenarios(product_ids: List[str], review_ids: List[str]) -> List[Scenario]:
+    rng = random.Random(7)
+    counter = itertools.count()
+    sample_product = {
+        "name": "Benchmark Coaster",
+        "description": "Synthetic product created by the benchmark suite",
+        "price": 499,
+        "category": "Coasters",
+        "images": [],
+    }
+
+    def update_product_body():
+        return {"price": rng.randint(100, 5000)}
+
+    def upload_files():
+        return {
+            "file": (
+                f"bench_{next(counter)}.png",
+                b"\x89PNG" + b"0" * 2048,
+                "image/png",
+            )
+        }
+
+    return [
+        Scenario("GET /api/products", lambda: ("GET", "/api/products", {})),
+        Scenario(
+            "GET /api/products/featured", lambda: ("GET", "/api/products/featured", {})
+        ),
+        Scenario(
+            "GET /api/products/{id}",
+            lambda: ("GET", f"/api/products/{rng.choice(product_ids)}", {}),
+        ),
+        Scenario(
+            "POST /api/products/lookup (20 ids)",
+            lambda: (
+                "POST",
+                "/api/products/lookup",
+                {"json": {"ids": rng.sample(product_ids, min(20, len(product_ids)))}},
+            ),
+        ),
+        Scenario("GET /api/reviews", lambda: ("GET", "/api/reviews", {})),
+        Scenario(
+            "GET /api/reviews (rating filter, 50 per page)",
+            lambda: (
+                "GET",
+                "/api/reviews",
+                {"params": {"min_rating": rng.randint(1, 5), "limit": 50}},
+            ),
+        ),
+        Scenario(
+            "GET /api/reviews/featured", lambda: ("GET", "/api/reviews/featured", {})
+        ),
+        Scenario(
+            "GET /api/reviews/{id}",
+            lambda: ("GET", f"/api/reviews/{rng.choice(review_ids)}", {}),
+        ),
+        Scenario("GET /api/settings", lambda: ("GET", "/api/settings", {})),
+        Scenario(
+            "GET /api/settings/carousel", lambda: ("GET", "/api/settings/carousel", {})
+        ),
+        Scenario(
+            "GET /api/settings/features", lambda: ("GET", "/api/settings/features", {})
+        ),
+        Scenario(
+            "POST /api/products",
+            lambda: ("POST", "/api/products", {"json": sample_product}),
+            admin=True,
+        ),
+        Scenario(
+            "PUT /api/products/{id}",
+            lambda: (
+                "PUT",
+                f"/api/products/{rng.choice(product_ids)}",
+                {"json": update_product_body()},
+            ),
+            admin=True,
+        ),
+        Scenario(
+            "PUT /api/settings",
+            lambda: ("PUT", "/api/settings", {"json": {"footer_text": "bench"}}),
+            admin=True,
+        ),
+        Scenario(
+            "POST /api/upload",
+            lambda: ("POST", "/api/upload", {"files": upload_files()}),
+            admin=True,
+        ),
+    ]
+
+
+async def drive(client, scenario: Scenario, requests: int, concurrency: int) -> Dict:
+    """Fire `requests` calls at one scenario from `concurrency` clients"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = itertools.count()
+    headers = ADMIN_HEADERS if scenario.admin else {}
+
+    async def worker():
+        nonlocal errors
+        while next(remaining) < requests:
+            method, url, kwargs = scenario.build()
+            start = time.perf_counter()
+            response = await client.request(method, url, headers=headers, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "endpoint": scenario.name,
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": (
+            round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0
+        ),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "rss_bytes": current_rss(),
+    }
+
+
+async def run_size(size: int, args) -> List[Dict]:
+    async with booted_app(args.mongodb_url) as (client, db, _store):
+        print(f"Seeding {size} products...", file=sys.stderr)
+        await seed_catalog(db, size)
+        product_ids = [
+            str(p["_id"]) for p in await db.products.find({}, {"_id": 1}).to_list(1000)
+        ]
+        review_ids = [
+            str(r["_id"]) for r in await db.reviews.find({}, {"_id": 1}).to_list(1000)
+        ]
+
+        results = []
+        for scenario in build_scenarios(product_ids, review_ids):
+            if args.endpoints and not any(e in scenario.name for e in args.endpoints):
+                continue
+            # Warm up so one-off costs (imports, first queries) don't skew p99
+            await drive(client, scenario, min(args.concurrency, args.requests), 1)
+            result = await drive(client, scenario, args.requests, args.concurrency)
+            result["catalog_size"] = size
+            results.append(result)
+            print(
+                f"  [{size}] {scenario.name}: p50={result['p50_ms']}ms "
+                f"p99={result['p99_ms']}ms {result['throughput_rps']} req/s",
+                file=sys.stderr,
+            )
+        return results
+
+
+def compare(results: List[Dict], baseline: Dict) -> List[Dict]:
+    """Annotate results with relative changes against a baseline run"""
+    previous = {
+        (r["catalog_size"], r["endpoint"]): r for r in baseline.get("results", [])
+    }
+    for result in results:
+        before = previous.get((result["catalog_size"], result["endpoint"]))
+        if not before:
+            continue
+        result["baseline"] = {
+            key: {
+                "before": before[key],
+                "change_pct": (
+                    round((result[key] - before[key]) / before[key] * 100, 2)
+                    if before[key]
+                    else None
+                ),
+            }
+            for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "rss_bytes")
+        }
+    return results
+
+
+async def main(args) -> Dict:
+    results = []
+    for size in args.sizes:
+        results.extend(await run_size(size, args))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            results = compare(results, json.load(f))
+
+    return {
+        "meta": {
+            "generated_at": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests_per_endpoint": args.requests,
+            "concurrency": args.concurrency,
+            "database": "mongod" if args.mongodb_url else "mongomock",
+        },
+        "results": results,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=DEFAULT_SIZES,
+        help="comma-separated catalog sizes (default: 100,10000)",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=500, help="requests per endpoint"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=32, help="concurrent clients"
+    )
+    parser.add_argument(
+        "--endpoints",
+        nargs="*",
+        help="only run endpoints whose name contains any of these",
+    )
+    parser.add_argument(
+        "--mongodb-url",
+        help="run against this MongoDB server instead of the in-memory stand-in "
+        "(its database name must end in _bench; it is wiped and reseeded)",
+    )
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.mongodb_url:
+        try:
+            check_bench_url(args.mongodb_url)
+        except ValueError as exc:
+            parser.error(str(exc))
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)